@@ -1,14 +1,32 @@
 
-import os, io, re, csv, uuid
-from datetime import datetime, timedelta, time
-from typing import List, Optional, Tuple
-from pydantic import BaseModel, Field
+import os, io, re, csv, json, sys, uuid, hashlib
+from bisect import bisect_left
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, time
+from functools import lru_cache
+
+try:
+    from orjson import loads as _json_loads  # C-backed, 2-5x faster than stdlib
+except ImportError:
+    from json import loads as _json_loads
+
+try:
+    from rapidfuzz import fuzz as _fuzz  # fuzzy title dedup; optional
+except ImportError:
+    _fuzz = None
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple, Union
 from dateutil import tz
-import dateparser
-from PyPDF2 import PdfReader
+# dateparser, pypdf/PyPDF2 and openai are deliberately NOT imported here:
+# dateparser alone compiles thousands of regexes at import time, and a user
+# who never uploads a PDF or sets an API key shouldn't pay for either.
+# Each is imported inside the function that needs it (cheap after the first
+# call via sys.modules).
 
 # ---------- Config (can be tweaked by the UI by setting these module vars) ----------
 APP_TZ = tz.gettz("America/Los_Angeles")  # default locale
+UTC = tz.UTC
 DEFAULT_DAILY_HOURS = 2.0
 WORK_START = time(9, 0)
 WORK_END = time(21, 0)
@@ -17,30 +35,53 @@ OUTPUT_DIR = "exports"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # ---------- Optional OpenAI ----------
-USE_LLM = False
-try:
-    import os as _os
-    from openai import OpenAI
-    if _os.environ.get("OPENAI_API_KEY"):
-        client = OpenAI()
-        USE_LLM = True
-except Exception:
-    USE_LLM = False
+USE_LLM = bool(os.environ.get("OPENAI_API_KEY"))
+client = None
+
+def _get_client():
+    # Lazily import/construct the OpenAI client; flips USE_LLM off if the
+    # package is missing so callers fall back to rule-based extraction.
+    global client, USE_LLM
+    if client is None and USE_LLM:
+        try:
+            from openai import OpenAI
+            client = OpenAI()
+        except Exception:
+            USE_LLM = False
+    return client
 
 # ---------- Data Models ----------
-class Task(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4())[:8])
+@dataclass(slots=True)
+class Task:
     title: str
+    id: str = field(default_factory=lambda: str(uuid.uuid4())[:8])
     due: Optional[datetime] = None
     est_minutes: Optional[int] = 60
     tag: Optional[str] = None # course/project
     priority: int = 3         # 1=high, 5=low
     source: Optional[str] = None
 
+    @classmethod
+    def from_llm(cls, d: dict, source: Optional[str] = None) -> "Task":
+        # LLM output is the one untrusted boundary; coerce types here instead
+        # of paying validation on every rule-based construction
+        return cls(
+            title=str(d.get("title", "Untitled task")),
+            due=_parse_due_raw(str(d["due"])) if d.get("due") else None,
+            est_minutes=int(d.get("est_minutes", 60) or 60),
+            tag=d.get("tag"),
+            priority=int(d.get("priority", 3) or 3),
+            source=source,
+        )
+
 # ---------- Utilities ----------
 def read_pdf_bytes(file_bytes: bytes) -> str:
     try:
-        reader = PdfReader(io.BytesIO(file_bytes))
+        try:
+            from pypdf import PdfReader  # maintained fork of PyPDF2, faster text extraction
+        except ImportError:
+            from PyPDF2 import PdfReader
+        reader = PdfReader(io.BytesIO(file_bytes), strict=False)
         text = []
         for page in reader.pages:
             text.append(page.extract_text() or "")
@@ -48,57 +89,165 @@ def read_pdf_bytes(file_bytes: bytes) -> str:
     except Exception:
         return ""
 
-def parse_possible_date(s: str) -> Optional[datetime]:
-    dt = dateparser.parse(
-        s,
-        settings={"TIMEZONE":"US/Pacific","RETURN_AS_TIMEZONE_AWARE":True}
-    )
+_DP_SETTINGS = {"TIMEZONE":"US/Pacific","RETURN_AS_TIMEZONE_AWARE":True}
+
+def _dateparser_parse(s: str) -> Optional[datetime]:
+    import dateparser
+    dt = dateparser.parse(s, settings=_DP_SETTINGS)
     if dt:
         return dt.astimezone(APP_TZ)
     return None
 
-DUE_PAT = re.compile(
+# dateparser.parse is slow (especially on strings that don't parse), and the
+# same date strings recur across syllabus lines, so cache by raw string.
+_parse_date_cached = lru_cache(maxsize=4096)(_dateparser_parse)
+
+# Strings that resolve relative to "now" would go stale if cached across days
+# (Streamlit sessions can live that long), so they bypass the cache.
+_RELATIVE_HINTS = ("today", "tomorrow", "next ", "now", "ago")
+
+def iter_pdf_lines(file_bytes: bytes):
+    """Yield non-empty stripped lines page by page, so huge PDFs never need
+    the whole document's text in memory at once."""
+    try:
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            from PyPDF2 import PdfReader
+        reader = PdfReader(io.BytesIO(file_bytes), strict=False)
+        for page in reader.pages:
+            for ln in (page.extract_text() or "").splitlines():
+                ln = ln.strip()
+                if ln:
+                    yield ln
+    except Exception:
+        return
+
+def parse_possible_date(s: str) -> Optional[datetime]:
+    lc = s.casefold()
+    if any(h in lc for h in _RELATIVE_HINTS):
+        return _dateparser_parse(s)
+    return _parse_date_cached(s)
+
+# Pattern sources are kept as strings so they can be fused into COMBINED below.
+# Quantifiers whose neighbours can't overlap are possessive (Python 3.11+) so
+# failed matches on long PDF text bail out instead of backtracking.
+DUE_SRC = (
     r"(?:(?:due|deadline|submit|by)\s*:?|\b)\s*(?:on\s+)?"
-    r"((?:\b(?:Mon|Tue|Wed|Thu|Fri|Sat|Sun)\b)?\s*[A-Z]?[a-z]{2,9}\s+\d{1,2}(?:,\s*\d{4})?"
+    r"(?P<due_date>(?:\b(?:Mon|Tue|Wed|Thu|Fri|Sat|Sun)\b)?+\s*+[A-Z]?+[a-z]{2,9}+\s++\d{1,2}+(?:,\s*\d{4})?"
     r"|(?:\d{1,2}/\d{1,2}(?:/\d{2,4})?)"
-    r"|(?:tomorrow|today|next\s+(?:Mon|Tue|Wed|Thu|Fri|Sat|Sun)))",
-    re.IGNORECASE
+    r"|(?:tomorrow|today|next\s+(?:Mon|Tue|Wed|Thu|Fri|Sat|Sun)))"
 )
+EST_SRC = r"(?:~?\s*)(?P<est_val>\d++(?:\.\d++)?)\s*+(?P<est_unit>h(?:ours?)?|m(?:in(?:s|utes)?)?)"
+TAG_SRC = r"\b(?P<tag_val>CS\d{1,3}|Calc\s*3|Linear\s*Algebra|Physics|Project|Work|Personal)\b"
 
-EST_PAT = re.compile(r"(?:~?\s*)(\d+(?:\.\d+)?)\s*(h(?:ours?)?|m(?:in(?:s|utes)?)?)", re.IGNORECASE)
-TAG_PAT = re.compile(r"\b(CS\d{1,3}|Calc\s*3|Linear\s*Algebra|Physics|Project|Work|Personal)\b", re.IGNORECASE)
+if sys.version_info < (3, 11):
+    # possessive quantifiers need 3.11+; strip the trailing '+' so older
+    # interpreters get the plain greedy (backtracking) forms instead of
+    # failing to import
+    _DOWNGRADE = re.compile(r"([?*+]|\{\d+(?:,\d+)?\})\+")
+    DUE_SRC = _DOWNGRADE.sub(r"\1", DUE_SRC)
+    EST_SRC = _DOWNGRADE.sub(r"\1", EST_SRC)
 
-def rule_based_extract(text: str, source_name: str = "input") -> List[Task]:
+DUE_PAT = re.compile(DUE_SRC, re.IGNORECASE)
+EST_PAT = re.compile(EST_SRC, re.IGNORECASE)
+TAG_PAT = re.compile(TAG_SRC, re.IGNORECASE)
+# One alternation so rule_based_extract walks each line once instead of 3x.
+# Tag goes first so course names like "Calc 3" aren't swallowed by the looser
+# due-date alternative.
+COMBINED = re.compile(f"(?P<tag>{TAG_SRC})|(?P<due>{DUE_SRC})|(?P<est>{EST_SRC})", re.IGNORECASE)
+VERBS = ("assign","finish","read","solve","submit","implement","study","review","fix","email","apply","prepare","meet","write")
+VERB_PAT = re.compile(r"\b(%s)\b" % "|".join(VERBS), re.IGNORECASE)
+WS_PAT = re.compile(r"\s+")
+
+_SLASH_DATE = re.compile(r"(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?$")
+_MONTH_DATE = re.compile(r"([A-Za-z]{3,9})\s+(\d{1,2})(?:,\s*(\d{4}))?$")
+_DAY_ABBRS = ("mon","tue","wed","thu","fri","sat","sun")
+
+def fast_parse_due(s: str) -> Optional[datetime]:
+    """Parse the common due-date shapes (MM/DD, 'Oct 6', today/tomorrow,
+    'next Fri', ISO) with cheap stdlib paths; anything unrecognized falls
+    back to dateparser via parse_possible_date."""
+    raw = s.strip()
+    lc = raw.casefold()
+    now = datetime.now(APP_TZ)
+    if lc == "today":
+        return now
+    if lc == "tomorrow":
+        return now + timedelta(days=1)
+    if lc.startswith("next "):
+        day = lc[5:].strip()[:3]
+        if day in _DAY_ABBRS:
+            return now + timedelta(days=(_DAY_ABBRS.index(day) - now.weekday()) % 7 or 7)
+    m = _SLASH_DATE.match(raw)
+    if m:
+        mo, d, y = int(m[1]), int(m[2]), m[3]
+        year = now.year if y is None else int(y) + (2000 if len(y) == 2 else 0)
+        try:
+            return datetime(year, mo, d, tzinfo=APP_TZ)
+        except ValueError:
+            return parse_possible_date(s)
+    m = _MONTH_DATE.match(raw)
+    if m:
+        try:
+            mo = datetime.strptime(m[1][:3].title(), "%b").month
+            return datetime(int(m[3]) if m[3] else now.year, mo, int(m[2]), tzinfo=APP_TZ)
+        except ValueError:
+            return parse_possible_date(s)
+    try:
+        dt = datetime.fromisoformat(raw)
+        return dt.astimezone(APP_TZ) if dt.tzinfo else dt.replace(tzinfo=APP_TZ)
+    except ValueError:
+        pass
+    return parse_possible_date(s)
+
+# Priority breakpoints on days-until-due: <=1 -> 1, <=3 -> 2, <=13 -> 3, else 4
+_PRIO_DAYS = (1, 3, 13)
+_PRIO_VALS = (1, 2, 3, 4)
+
+def extract_tasks_from_lines(lines: Iterable[str], source_name: str = "input") -> List[Task]:
+    """Core line-by-line extractor; accepts any iterable of lines (e.g.
+    iter_pdf_lines) so callers don't have to materialize the whole text."""
     tasks: List[Task] = []
-    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
+    now = datetime.now(APP_TZ)  # invariant for the whole batch
+    now_ord = now.toordinal()
     for ln in lines:
-        # Heuristic: lines with verbs/keywords become candidate tasks
-        if re.search(r"\b(assign|finish|read|solve|submit|implement|study|review|fix|email|apply|prepare|meet|write)\b", ln, re.IGNORECASE):
+        ln = ln.strip()
+        if not ln:
+            continue
+        # Heuristic: lines with verbs/keywords become candidate tasks.
+        # Cheap substring pre-filter first; most lines contain no keyword at
+        # all, and C-level 'in' beats the regex engine on the skip path.
+        lc = ln.casefold()
+        if any(v in lc for v in VERBS) and VERB_PAT.search(ln):
             title = ln
-            # Due date
+            # One scan for due/est/tag; keep the first hit of each kind
             due = None
-            m = DUE_PAT.search(ln)
-            if m:
-                due = parse_possible_date(m.group(1))
-            # Estimate
             est = 60
-            e = EST_PAT.search(ln)
-            if e:
-                val, unit = e.group(1), e.group(2).lower()
-                est = int(round(float(val) * (60 if unit.startswith('h') else 1)))
-            # Tag
+            est_found = False
             tg = None
-            t = TAG_PAT.search(ln)
-            if t:
-                tg = t.group(0)
-            # Priority heuristic (earlier due = higher)
-            prio = 3
+            for m in COMBINED.finditer(ln):
+                if m.group("due") is not None:
+                    if due is None:
+                        due = fast_parse_due(m.group("due_date"))
+                elif m.group("est") is not None:
+                    if not est_found:
+                        val, unit = m.group("est_val"), m.group("est_unit").lower()
+                        est = int(round(float(val) * (60 if unit.startswith('h') else 1)))
+                        est_found = True
+                elif tg is None:
+                    tg = m.group("tag_val")
+            # Priority heuristic (earlier due = higher): branchless table lookup
+            # on whole calendar days (int subtract, no timedelta allocation)
             if due:
-                days = (due - datetime.now(APP_TZ)).total_seconds() / 86400
-                if days <= 1: prio = 1
-                elif days <= 3: prio = 2
-                elif days >= 14: prio = 4
+                prio = _PRIO_VALS[bisect_left(_PRIO_DAYS, due.toordinal() - now_ord)]
+            else:
+                prio = 3
             tasks.append(Task(title=title, due=due, est_minutes=est, tag=tg, priority=prio, source=source_name))
+    return tasks
+
+def rule_based_extract(text: str, source_name: str = "input") -> List[Task]:
+    tasks = extract_tasks_from_lines(text.splitlines(), source_name)
     # If nothing found, create one generic task out of the blob
     if not tasks and text.strip():
         tasks.append(Task(title="Review: " + (text.strip()[:60].replace("\n"," ")+("..." if len(text)>60 else "")),
@@ -110,9 +259,68 @@ Return a JSON list with objects: {title, due (ISO if present), est_minutes (int,
 Prefer short, actionable titles. Infer reasonable estimates. If no due date, omit it.
 """
 
+@lru_cache(maxsize=4096)
+def _parse_due_raw(s: str) -> Optional[datetime]:
+    # Cached LLM due-string parser. The prompt asks for ISO dates, so try
+    # fromisoformat before falling back to dateparser.
+    try:
+        dt = datetime.fromisoformat(s.strip())
+        return dt.astimezone(APP_TZ) if dt.tzinfo else dt.replace(tzinfo=APP_TZ)
+    except ValueError:
+        pass
+    try:
+        import dateparser
+        due = dateparser.parse(s)
+        if due and due.tzinfo is None:
+            due = due.replace(tzinfo=APP_TZ)
+        if due:
+            due = due.astimezone(APP_TZ)
+        return due
+    except Exception:
+        return parse_possible_date(s)
+
+_LLM_CACHE_DIR = os.path.join(OUTPUT_DIR, "_llm_cache")
+
+def _llm_cache_path(text: str) -> str:
+    # keyed on prompt + document, so re-uploading the same syllabus (even in
+    # a later session) skips the API call entirely
+    key = hashlib.sha256((LLM_SYS + "\n" + text).encode()).hexdigest()
+    return os.path.join(_LLM_CACHE_DIR, key + ".json")
+
+def _llm_cache_load(path: str, source_name: str) -> Optional[List[Task]]:
+    # best-effort: a corrupt or stale-schema cache file is just a miss
+    try:
+        with open(path, "rb") as f:
+            rows = _json_loads(f.read())
+        return [Task(title=d["title"],
+                     due=datetime.fromisoformat(d["due"]) if d.get("due") else None,
+                     est_minutes=d.get("est_minutes"), tag=d.get("tag"),
+                     priority=d.get("priority", 3), source=source_name)
+                for d in rows]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def _llm_cache_store(path: str, tasks: List[Task]) -> None:
+    try:
+        os.makedirs(_LLM_CACHE_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump([{"title": t.title,
+                        "due": t.due.isoformat() if t.due else None,
+                        "est_minutes": t.est_minutes, "tag": t.tag,
+                        "priority": t.priority} for t in tasks], f)
+    except OSError:
+        pass  # cache is best-effort
+
 def llm_extract(text: str, source_name: str) -> List[Task]:
+    cache_path = _llm_cache_path(text)
+    cached = _llm_cache_load(cache_path, source_name)
+    if cached is not None:
+        return cached
     try:
-        msg = client.chat.completions.create(
+        cli = _get_client()
+        if cli is None:
+            return rule_based_extract(text, source_name)
+        msg = cli.chat.completions.create(
             model="gpt-4o-mini",
             temperature=0.2,
             messages=[
@@ -122,50 +330,80 @@ def llm_extract(text: str, source_name: str) -> List[Task]:
             response_format={"type":"json_object"}
         )
         content = msg.choices[0].message.content
-        import json
-        data = json.loads(content)
+        data = _json_loads(content)
         raw = data.get("tasks") if "tasks" in data else data
-        tasks: List[Task] = []
-        for t in raw:
-            due = None
-            if t.get("due"):
-                try:
-                    due = dateparser.parse(t["due"])
-                    if due and due.tzinfo is None:
-                        due = due.replace(tzinfo=APP_TZ)
-                    if due:
-                        due = due.astimezone(APP_TZ)
-                except Exception:
-                    due = parse_possible_date(str(t["due"]))
-            tasks.append(Task(
-                title=t.get("title","Untitled task"),
-                due=due,
-                est_minutes=int(t.get("est_minutes",60) or 60),
-                tag=t.get("tag"),
-                priority=int(t.get("priority",3) or 3),
-                source=source_name
-            ))
+        tasks: List[Task] = [Task.from_llm(t, source_name) for t in raw]
+        if tasks:
+            _llm_cache_store(cache_path, tasks)
         return tasks or rule_based_extract(text, source_name)
     except Exception:
         return rule_based_extract(text, source_name)
 
-def extract_tasks_from_inputs(raw_texts: List[Tuple[str,str]]) -> List[Task]:
-    all_tasks: List[Task] = []
-    for source_name, text in raw_texts:
+def _tasks_for_blob(source_name: str, payload: Union[str, bytes]) -> List[Task]:
+    if isinstance(payload, (bytes, bytearray)):
+        # PDF bytes: the LLM needs the full text, but the rule-based path
+        # streams lines page by page without materializing the document
         if USE_LLM:
-            tasks = llm_extract(text, source_name)
-        else:
-            tasks = rule_based_extract(text, source_name)
-        all_tasks.extend(tasks)
-    # De-duplicate by normalized title
-    seen = set()
-    deduped = []
+            return llm_extract(read_pdf_bytes(payload), source_name)
+        tasks = extract_tasks_from_lines(iter_pdf_lines(payload), source_name)
+        # mirror rule_based_extract's generic fallback for empty results
+        return tasks or [Task(title="Review: " + source_name, est_minutes=60, source=source_name)]
+    if USE_LLM:
+        return llm_extract(payload, source_name)
+    return rule_based_extract(payload, source_name)
+
+def extract_tasks_from_inputs(raw_texts: List[Tuple[str, Union[str, bytes]]]) -> List[Task]:
+    # each (source, payload) pair is pasted/decoded text, or raw PDF bytes
+    all_tasks: List[Task] = []
+    if USE_LLM and len(raw_texts) > 1:
+        # each llm_extract is a full API round-trip; overlap them
+        with ThreadPoolExecutor(max_workers=min(8, len(raw_texts))) as ex:
+            results = ex.map(lambda p: _tasks_for_blob(p[0], p[1]), raw_texts)
+            for tasks in results:  # map preserves input order
+                all_tasks.extend(tasks)
+    else:
+        for source_name, payload in raw_texts:
+            all_tasks.extend(_tasks_for_blob(source_name, payload))
+    return _dedup_tasks(all_tasks)
+
+def _merge_dup(keep: Task, dup: Task) -> None:
+    # merged task gets the tightest constraints of the pair
+    if dup.due and (keep.due is None or dup.due < keep.due):
+        keep.due = dup.due
+    keep.priority = min(keep.priority, dup.priority)
+    if (dup.est_minutes or 0) > (keep.est_minutes or 0):
+        keep.est_minutes = dup.est_minutes
+    if keep.tag is None:
+        keep.tag = dup.tag
+
+# "hw 3" and "hw3" should normalize to the same token
+_NUM_GLUE = re.compile(r"(?<=[a-z])\s+(?=\d)")
+_DIGIT_TOKENS = re.compile(r"\d+")
+
+def _dedup_tasks(all_tasks: List[Task]) -> List[Task]:
+    # De-duplicate by normalized title (dict keeps first occurrence, in order);
+    # with rapidfuzz installed, near-identical titles ("Finish hw3" vs
+    # "finish HW 3") collapse too and their fields are merged.
+    deduped = {}
     for t in all_tasks:
-        key = re.sub(r"\s+"," ", t.title.strip().lower())
-        if key not in seen:
-            seen.add(key)
-            deduped.append(t)
-    return deduped
+        key = _NUM_GLUE.sub("", WS_PAT.sub(" ", t.title.strip().lower()))
+        match = deduped.get(key)
+        if match is None and _fuzz is not None:
+            # Numbered siblings ("Lab 5" vs "Lab 6", "Chapter 7 by 10/05" vs
+            # "Chapter 8 by 10/07") score high because the one differing digit
+            # is diluted by the rest of the line — never merge titles whose
+            # digit tokens differ.
+            digits = sorted(_DIGIT_TOKENS.findall(key))
+            for k, cand in deduped.items():
+                if (_fuzz.token_set_ratio(key, k) >= 90
+                        and sorted(_DIGIT_TOKENS.findall(k)) == digits):
+                    match = cand
+                    break
+        if match is None:
+            deduped[key] = t
+        else:
+            _merge_dup(match, t)
+    return list(deduped.values())
 
 # ---------- Scheduling ----------
 def next_work_start(after: datetime) -> datetime:
@@ -180,84 +418,144 @@ def next_work_start(after: datetime) -> datetime:
 def plan_blocks(tasks: List[Task], daily_hours: float = DEFAULT_DAILY_HOURS) -> List[dict]:
     """Greedy: fill up to daily_hours per day per task priority, stopping by due date."""
     now = datetime.now(APP_TZ)
-    by_priority = sorted(tasks, key=lambda t: (t.priority, (t.due or (now+timedelta(days=30)))))
+    # Whole tasks are placed in one pass, so a sort gives the same order a
+    # (priority, due) heap would pop in; hoist the fallback due out of the key.
+    no_due = now + timedelta(days=30)
+    by_priority = sorted(tasks, key=lambda t: (t.priority, t.due or no_due))
     blocks = []
-    # Track used minutes per day
-    day_budget = {}
+    # Track used minutes per day, keyed by day ordinal (int hash, and the
+    # day-advance becomes a plain increment)
+    day_budget = defaultdict(int)
+    cap = int(daily_hours * 60)
+    ws_min = WORK_START.hour * 60 + WORK_START.minute
+    window = WORK_END.hour * 60 + WORK_END.minute - ws_min  # workday length in minutes
+
+    def day_start_of(day_ord):
+        # wall-clock work start for a day ordinal (one datetime per day, DST-safe)
+        d = date.fromordinal(day_ord)
+        return datetime(d.year, d.month, d.day, WORK_START.hour, WORK_START.minute, tzinfo=APP_TZ)
+
+    # Cursor is (day ordinal, minutes-into-workday); datetimes are only built
+    # when a block is emitted. 'earliest' marks the first day with budget left.
+    start0 = next_work_start(now)
+    off0 = max(0, start0.hour * 60 + start0.minute - ws_min)
+    earliest_ord, earliest_off = start0.toordinal(), off0
     for t in by_priority:
         remaining = max(30, int(t.est_minutes or 60))  # min 30 min
-        cursor = next_work_start(now)
+        day_ord, off = earliest_ord, earliest_off
+        day_start = day_start_of(day_ord)
         last_allowed = (t.due - timedelta(hours=1)) if t.due else now + timedelta(days=14)
-        while remaining > 0 and cursor <= last_allowed:
-            day_key = cursor.date().isoformat()
-            used = day_budget.get(day_key, 0)
-            cap = int(daily_hours * 60)
-            if used >= cap:
-                # advance to next day start
-                cursor = next_work_start(cursor.replace(hour=WORK_END.hour, minute=WORK_END.minute) + timedelta(minutes=1))
-                continue
-            # determine block length within hour window and day cap
+        la_ord = last_allowed.toordinal()
+        la_off = last_allowed.hour * 60 + last_allowed.minute - ws_min
+        while remaining > 0 and (day_ord, off) <= (la_ord, la_off):
+            used = day_budget[day_ord]
             block_len = min(BLOCK_MINUTES, remaining, cap - used)
-            block_end = cursor + timedelta(minutes=block_len)
-            # avoid crossing WORK_END
-            if block_end.time() > WORK_END:
-                cursor = next_work_start(cursor.replace(hour=WORK_END.hour, minute=WORK_END.minute) + timedelta(minutes=1))
+            # day cap hit, or block would cross WORK_END: jump straight to
+            # the next day's work start (no intermediate cursor positions)
+            if used >= cap or off + block_len > window:
+                if used >= cap and day_ord == earliest_ord:
+                    earliest_ord, earliest_off = day_ord + 1, 0
+                day_ord, off = day_ord + 1, 0
+                day_start = day_start_of(day_ord)
                 continue
+            start = day_start + timedelta(minutes=off)
             blocks.append({
                 "task_id": t.id,
                 "title": f"[{t.tag}] {t.title}" if t.tag else t.title,
-                "start": cursor,
-                "end": block_end,
+                "start": start,
+                "end": start + timedelta(minutes=block_len),
                 "due": t.due,
                 "source": t.source
             })
             remaining -= block_len
-            day_budget[day_key] = day_budget.get(day_key, 0) + block_len
-            cursor = block_end + timedelta(minutes=10)  # short break
+            day_budget[day_ord] += block_len
+            off += block_len + 10  # short break
     return blocks
 
 # ---------- Exports ----------
+def _fmt_ics(dt: datetime) -> str:
+    if dt.tzinfo is not UTC:
+        dt = dt.astimezone(UTC)
+    # int formatting beats strftime's locale-aware machinery per event
+    return f"{dt.year:04d}{dt.month:02d}{dt.day:02d}T{dt.hour:02d}{dt.minute:02d}{dt.second:02d}Z"
+
+def _ics_lines(blocks: List[dict]):
+    yield "BEGIN:VCALENDAR"
+    yield "VERSION:2.0"
+    yield "PRODID:-//StudentAgent//EN"
+    # one urandom read for the whole calendar; per-event uniqueness via counter
+    base = uuid.uuid4().hex
+    # DTSTAMP marks when the record was produced — one value serves the file
+    dtstamp = f"DTSTAMP:{_fmt_ics(datetime.now(APP_TZ))}"
+    for i, b in enumerate(blocks):
+        yield "BEGIN:VEVENT"
+        yield f"UID:{base}-{i}@studentagent"
+        yield dtstamp
+        yield f"DTSTART:{_fmt_ics(b['start'])}"
+        yield f"DTEND:{_fmt_ics(b['end'])}"
+        yield f"SUMMARY:{b['title']}"
+        yield "DESCRIPTION:Auto-planned block"
+        yield "END:VEVENT"
+    yield "END:VCALENDAR"
+
 def to_ics(blocks: List[dict]) -> str:
-    from dateutil import tz as _tz
-    def fmt(dt: datetime):
-        return dt.astimezone(_tz.UTC).strftime("%Y%m%dT%H%M%SZ")
-    lines = ["BEGIN:VCALENDAR","VERSION:2.0","PRODID:-//StudentAgent//EN"]
-    for b in blocks:
-        uid = str(uuid.uuid4())
-        lines += [
-            "BEGIN:VEVENT",
-            f"UID:{uid}",
-            f"DTSTAMP:{fmt(datetime.now(APP_TZ))}",
-            f"DTSTART:{fmt(b['start'])}",
-            f"DTEND:{fmt(b['end'])}",
-            f"SUMMARY:{b['title']}",
-            f"DESCRIPTION:{'Auto-planned block'}",
-            "END:VEVENT"
-        ]
-    lines.append("END:VCALENDAR")
-    return "\n".join(lines)
+    # join consumes the generator directly; no intermediate line list.
+    # RFC 5545 requires CRLF content-line delimiters.
+    return "\r\n".join(_ics_lines(blocks)) + "\r\n"
+
+CSV_HEADER = "id,title,due,est_minutes,tag,priority,source"
 
-def tasks_to_csv(tasks: List[Task]) -> str:
+def _csv_escape(v) -> str:
+    # minimal RFC-4180 quoting: only quote when the field needs it
+    s = "" if v is None else str(v)
+    if any(ch in s for ch in ',"\r\n'):
+        return '"' + s.replace('"', '""') + '"'
+    return s
+
+def tasks_to_csv(tasks: List[Task], use_csv_module: bool = False) -> str:
+    if use_csv_module:
+        return _tasks_to_csv_stdlib(tasks)
+    rows = [CSV_HEADER]
+    for t in tasks:
+        rows.append(",".join((
+            _csv_escape(t.id),
+            _csv_escape(t.title),
+            t.due.isoformat() if t.due else "",
+            _csv_escape(t.est_minutes),
+            _csv_escape(t.tag),
+            _csv_escape(t.priority),
+            _csv_escape(t.source),
+        )))
+    return "\r\n".join(rows) + "\r\n"
+
+def _tasks_to_csv_stdlib(tasks: List[Task]) -> str:
+    # safety hatch: the csv module handles any edge case the fast path might not
     output = io.StringIO()
     writer = csv.writer(output)
     writer.writerow(["id","title","due","est_minutes","tag","priority","source"])
-    for t in tasks:
-        writer.writerow([t.id, t.title, t.due.isoformat() if t.due else "", t.est_minutes, t.tag or "", t.priority, t.source or ""])
+    writer.writerows(
+        (t.id, t.title, t.due.isoformat() if t.due else "", t.est_minutes, t.tag or "", t.priority, t.source or "")
+        for t in tasks)
     return output.getvalue()
 
 FAR_FUTURE = datetime(9999, 12, 31, tzinfo=APP_TZ)  # tz-aware fallback
 
-def tasks_to_notion_md(tasks: List[Task]) -> str:
-    def sort_key(x: Task):
-        # normalize due to tz-aware for consistent comparisons
-        due = x.due
-        if due and due.tzinfo is None:
-            due = due.replace(tzinfo=APP_TZ)
-        return (x.priority, due or FAR_FUTURE)
+def to_app_tz(dt: datetime) -> datetime:
+    # parse_possible_date already normalizes to APP_TZ; skip the astimezone
+    # round-trip when the zone object is literally ours
+    return dt if dt.tzinfo is APP_TZ else dt.astimezone(APP_TZ)
 
+def tasks_to_notion_md(tasks: List[Task]) -> str:
+    # decorate-sort-undecorate: build the (priority, tz-normalized due) keys
+    # in one pass, then sort indices with the list's own __getitem__
+    keys = [(t.priority,
+             t.due.replace(tzinfo=APP_TZ) if t.due and t.due.tzinfo is None else (t.due or FAR_FUTURE))
+            for t in tasks]
+    order = sorted(range(len(tasks)), key=keys.__getitem__)
     lines = ["# Tasks", ""]
-    for t in sorted(tasks, key=sort_key):
-        due_str = t.due.astimezone(APP_TZ).strftime("%a %b %d, %I:%M %p") if t.due else "—"
+    for i in order:
+        t = tasks[i]
+        due_str = to_app_tz(t.due).strftime("%a %b %d, %I:%M %p") if t.due else "—"
         lines.append(
             f"- **P{t.priority}** {t.title}  \n"
             f"  • Tag: `{t.tag or '-'}`  \n"
@@ -275,9 +573,10 @@ def as_bytes(data):
 
 __all__ = [
     "Task",
-    "APP_TZ","DEFAULT_DAILY_HOURS","WORK_START","WORK_END","BLOCK_MINUTES",
+    "APP_TZ","UTC","DEFAULT_DAILY_HOURS","WORK_START","WORK_END","BLOCK_MINUTES",
     "USE_LLM",
-    "read_pdf_bytes","parse_possible_date","rule_based_extract","llm_extract","extract_tasks_from_inputs",
+    "read_pdf_bytes","iter_pdf_lines","parse_possible_date","fast_parse_due",
+    "rule_based_extract","extract_tasks_from_lines","llm_extract","extract_tasks_from_inputs",
     "next_work_start","plan_blocks",
-    "to_ics","tasks_to_csv","tasks_to_notion_md","as_bytes"
+    "to_ics","tasks_to_csv","tasks_to_notion_md","to_app_tz","as_bytes"
 ]